@@ -6,6 +6,7 @@ from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, Callbac
 from telegram.error import TimedOut, NetworkError
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 from downloader import Downloader
+import config
 
 # Load environment variables
 load_dotenv()
@@ -43,7 +44,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     status_msg = await update.message.reply_text("Fetching info...")
     
     # Get info first to confirm validity and title
-    info = downloader.get_info(url)
+    # Runs in a thread so other chats aren't frozen while the watchdog waits
+    info = await asyncio.to_thread(downloader.get_info, url)
     
     if info['status'] == 'error':
         await status_msg.edit_text(f"Error: {info['message']}")
@@ -78,10 +80,14 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
+    # Updates run concurrently, so a newer link from the same user can overwrite user_data
+    # while we await. Read the session once here and pass it along instead of re-reading it.
+    url = context.user_data.get('url')
+    title = context.user_data.get('title')
+    thumbnail = context.user_data.get('thumbnail')
     await query.answer()
     
     data = query.data
-    url = context.user_data.get('url')
     
     if not url:
         if query.message.caption:
@@ -121,7 +127,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 InlineKeyboardButton("Audio 🎵", callback_data="type_audio")
             ]
         ]
-        text = f"Found: {context.user_data.get('title')}\n\nSelect format:"
+        text = f"Found: {title}\n\nSelect format:"
         if query.message.caption:
             await query.edit_message_caption(text, reply_markup=InlineKeyboardMarkup(keyboard))
         else:
@@ -138,12 +144,13 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:
             await query.edit_message_text(status_text)
             
-        await process_download(query.message, context, url, ftype, quality)
+        await process_download(query.message, url, thumbnail, ftype, quality)
 
 import time
 
-async def process_download(message, context, url, ftype, quality):
+async def process_download(message, url, thumbnail, ftype, quality):
     last_update_time = 0
+    loop = asyncio.get_running_loop()
     
     def progress_hook(d):
         nonlocal last_update_time
@@ -165,8 +172,8 @@ async def process_download(message, context, url, ftype, quality):
                     status = f"Downloading {ftype} ({quality})...\n{bar} {clean_percent}%"
                     
                     # We can't use await here directly because it's a sync callback
-                    # So we create a task
-                    asyncio.create_task(update_progress(message, status))
+                    # running in the download thread, so hand the edit over to the loop
+                    loop.call_soon_threadsafe(asyncio.create_task, update_progress(message, status))
                     last_update_time = current_time
                 except Exception:
                     pass
@@ -191,7 +198,7 @@ async def process_download(message, context, url, ftype, quality):
 
     try:
         # Download the content
-        result = downloader.download(url, ftype, quality, progress_hook=progress_hook)
+        result = await asyncio.to_thread(downloader.download, url, ftype, quality, progress_hook=progress_hook)
         
         if result['status'] == 'error':
             if message.caption:
@@ -221,31 +228,33 @@ async def process_download(message, context, url, ftype, quality):
         else:
             await message.edit_text("Uploading...")
         
+        # wait_for treats 0 as "time out now", config uses it for "disabled"
+        upload_timeout = config.upload_timeout or None
+
         try:
             with open(file_path, 'rb') as f:
                 if media_type == 'image':
-                    await message.reply_photo(
+                    await asyncio.wait_for(message.reply_photo(
                         photo=f, 
                         caption=title,
                         read_timeout=60,
                         write_timeout=60,
                         connect_timeout=60
-                    )
+                    ), timeout=upload_timeout)
                 elif media_type == 'audio':
                     # For audio, we can also try to attach the thumbnail if available
-                    thumb = context.user_data.get('thumbnail')
-                    await message.reply_audio(
+                    await asyncio.wait_for(message.reply_audio(
                         audio=f,
                         caption=title,
                         title=title,
-                        thumbnail=thumb if thumb else None,
+                        thumbnail=thumbnail if thumbnail else None,
                         read_timeout=300,
                         write_timeout=300,
                         connect_timeout=60,
                         # progress=upload_callback_wrapper
-                    )
+                    ), timeout=upload_timeout)
                 else:
-                    await message.reply_video(
+                    await asyncio.wait_for(message.reply_video(
                         video=f, 
                         caption=title, 
                         supports_streaming=True,
@@ -256,7 +265,7 @@ async def process_download(message, context, url, ftype, quality):
                         write_timeout=300,
                         connect_timeout=60,
                         # progress=upload_callback_wrapper
-                    )
+                    ), timeout=upload_timeout)
             await message.delete()
         except TimedOut:
             logger.warning("Upload timed out, but file might still be sent.")
@@ -264,6 +273,13 @@ async def process_download(message, context, url, ftype, quality):
                 await message.edit_caption("Upload timed out. The file might still appear in a moment.")
             else:
                 await message.edit_text("Upload timed out. The file might still appear in a moment.")
+        except asyncio.TimeoutError:
+            # Our own deadline cancelled the request, Telegram may still have received the whole file
+            timeout_msg = downloader.record_timeout('upload')['message']
+            if message.caption:
+                await message.edit_caption(timeout_msg)
+            else:
+                await message.edit_text(timeout_msg)
             
     except Exception as e:
         logger.error(f"Error handling message: {e}")
@@ -305,7 +321,8 @@ def main():
         print("Error: Please set TELEGRAM_BOT_TOKEN in .env file.")
         return
 
-    application = ApplicationBuilder().token(token).read_timeout(30).write_timeout(30).build()
+    # concurrent_updates lets one chat's download run while other chats are being answered
+    application = ApplicationBuilder().token(token).read_timeout(30).write_timeout(30).concurrent_updates(True).build()
 
     start_handler = CommandHandler('start', start)
     help_handler = CommandHandler('help', help_command)
@@ -2,3 +2,9 @@ token = "8457133468:AAHTyaFeD-DA1vrDbroIo2IgD1pylj8B3rY"  # telegram token
 logs = None  # logs channel id, if none set to None
 max_filesize = 500000000  # bytes
 output_folder="/tmp/yt-dlp-telegram"
+
+# Per-stage deadlines in seconds, set to None or 0 to disable
+extract_timeout = 60  # fetching info before any bytes arrive
+download_stall_timeout = 30  # no new bytes received
+postprocess_timeout = 300  # ffmpeg merge/convert
+upload_timeout = 600  # sending the file to Telegram
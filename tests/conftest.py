@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# sys.path is handed to spawned workers too, so they pick up the stub as well
+sys.path.insert(0, os.path.join(ROOT, 'tests', 'stubs'))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,2 @@
+def load_dotenv(*args, **kwargs):
+    return False
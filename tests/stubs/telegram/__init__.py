@@ -0,0 +1,22 @@
+"""
+Just enough of python-telegram-bot for bot.py to import.
+"""
+
+
+class Update:
+    pass
+
+
+class CallbackQuery:
+    pass
+
+
+class InlineKeyboardButton:
+    def __init__(self, text, callback_data=None):
+        self.text = text
+        self.callback_data = callback_data
+
+
+class InlineKeyboardMarkup:
+    def __init__(self, inline_keyboard):
+        self.inline_keyboard = inline_keyboard
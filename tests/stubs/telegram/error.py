@@ -0,0 +1,6 @@
+class NetworkError(Exception):
+    pass
+
+
+class TimedOut(NetworkError):
+    pass
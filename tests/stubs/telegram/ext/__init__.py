@@ -0,0 +1,21 @@
+class ContextTypes:
+    DEFAULT_TYPE = object
+
+
+class ApplicationBuilder:
+    pass
+
+
+class CommandHandler:
+    pass
+
+
+class MessageHandler:
+    pass
+
+
+class CallbackQueryHandler:
+    pass
+
+
+filters = None
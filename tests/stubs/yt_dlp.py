@@ -0,0 +1,88 @@
+"""
+Minimal stand-in for yt_dlp, the URL picks how the fake download behaves.
+"""
+import functools
+import os
+import subprocess
+import time
+
+
+class YoutubeDL:
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def prepare_filename(self, info):
+        return self.params['outtmpl'].replace('%(ext)s', info['ext'])
+
+    def _hook(self, **d):
+        for hook in self.params.get('progress_hooks', []):
+            hook(d)
+
+    def extract_info(self, url, download=True):
+        if url == 'stub://hang':
+            time.sleep(3600)
+
+        info = {
+            'title': 'Stub',
+            'ext': 'mp4',
+            'duration': 1,
+            'thumbnail': None,
+            # Live DASH manifests carry callables like this, they can't be pickled
+            'formats': [{'fragments': functools.partial(print)}],
+        }
+        if not download:
+            return info
+
+        path = self.prepare_filename(info)
+        if url == 'stub://stall':
+            with open(f'{path}.part', 'wb') as f:
+                f.write(b'x' * 1024)
+            self._hook(status='downloading', downloaded_bytes=1024)
+            time.sleep(3600)
+
+        if url == 'stub://postprocess':
+            # Part done, then a postprocessor that never returns
+            with open(path, 'wb') as f:
+                f.write(b'data')
+            self._hook(status='finished', downloaded_bytes=4)
+            time.sleep(3600)
+
+        if url == 'stub://crash':
+            # Dies mid-job like an OOM kill, leaving a file and an ffmpeg-like child behind
+            with open(path, 'wb') as f:
+                f.write(b'data')
+            child = subprocess.Popen(['sleep', '3600'])
+            with open(os.environ['STUB_CHILD_PID_FILE'], 'w') as f:
+                f.write(str(child.pid))
+            self._hook(status='finished', downloaded_bytes=4)
+            os._exit(3)
+
+        if url == 'stub://second-format':
+            # First format finishes, the second one comes through ffmpeg without hooks
+            with open(f'{path}.f1', 'wb') as f:
+                f.write(b'x' * 1024)
+            self._hook(status='finished', downloaded_bytes=1024)
+            with open(f'{path}.f2.part', 'wb') as f:
+                for _ in range(15):
+                    f.write(b'x' * 1024)
+                    f.flush()
+                    time.sleep(0.2)
+
+        if url == 'stub://ffmpeg':
+            # Like FFmpegFD: the file grows but only 'finished' is reported
+            with open(f'{path}.part', 'wb') as f:
+                for _ in range(20):
+                    f.write(b'x' * 1024)
+                    f.flush()
+                    time.sleep(0.2)
+
+        with open(path, 'wb') as f:
+            f.write(b'data')
+        self._hook(status='finished', downloaded_bytes=4)
+        return info
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+import bot
+import config
+
+
+class FakeMessage:
+    caption = None
+    text = 'Downloading...'
+
+    def __init__(self, upload_seconds):
+        self.upload_seconds = upload_seconds
+        self.edits = []
+        self.deleted = False
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append(text)
+
+    async def reply_video(self, **kwargs):
+        await asyncio.sleep(self.upload_seconds)
+
+    async def delete(self):
+        self.deleted = True
+
+
+@pytest.fixture
+def media(tmp_path, monkeypatch):
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(b'data')
+    monkeypatch.setattr(bot, 'downloader', bot.Downloader())
+    monkeypatch.setattr(bot.downloader, 'download', lambda *args, **kwargs: {
+        'status': 'success', 'type': 'video', 'path': str(path), 'title': 'Stub', 'duration': 1,
+    })
+    return path
+
+
+def test_upload_timeout(media, monkeypatch):
+    monkeypatch.setattr(config, 'upload_timeout', 0.1)
+    message = FakeMessage(upload_seconds=1)
+    asyncio.run(bot.process_download(message, 'stub://ok', None, 'video', 'best'))
+    assert not message.deleted
+    assert message.edits[-1].startswith('Upload cancelled after 0.1s')
+    assert bot.downloader.timeouts == {'upload': 1}
+    assert not media.exists()
+
+
+@pytest.mark.parametrize('disabled', [0, None])
+def test_upload_timeout_disabled(media, monkeypatch, disabled):
+    monkeypatch.setattr(config, 'upload_timeout', disabled)
+    message = FakeMessage(upload_seconds=0.2)
+    asyncio.run(bot.process_download(message, 'stub://ok', None, 'video', 'best'))
+    assert message.deleted
+    assert not bot.downloader.timeouts
+    assert not media.exists()
@@ -0,0 +1,106 @@
+import os
+import time
+
+import pytest
+
+import config
+import downloader
+
+
+@pytest.fixture
+def dl(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'output_folder', str(tmp_path))
+    monkeypatch.setattr(config, 'extract_timeout', 5)
+    monkeypatch.setattr(config, 'download_stall_timeout', 5)
+    monkeypatch.setattr(config, 'postprocess_timeout', 5)
+    monkeypatch.setattr(downloader, 'WATCHDOG_INTERVAL', 0.1)
+    return downloader.Downloader()
+
+
+def test_get_info_success(dl):
+    result = dl.get_info('stub://ok')
+    assert result == {'status': 'success', 'title': 'Stub', 'thumbnail': None, 'duration': 1}
+
+
+def test_get_info_hung_extraction_times_out(dl, monkeypatch):
+    monkeypatch.setattr(config, 'extract_timeout', 1)
+    result = dl.get_info('stub://hang')
+    assert result['status'] == 'error'
+    assert result['timeout'] == 'extraction'
+    assert dl.timeouts == {'extraction': 1}
+
+
+def test_download_success(dl, tmp_path):
+    hook_events = []
+    result = dl.download('stub://ok', progress_hook=hook_events.append)
+    assert result['status'] == 'success'
+    assert result['type'] == 'video'
+    assert os.path.dirname(result['path']) == str(tmp_path)
+    with open(result['path'], 'rb') as f:
+        assert f.read() == b'data'
+    assert [d['status'] for d in hook_events] == ['finished']
+    assert not dl.timeouts
+
+
+def test_download_stall_kills_worker_and_removes_part_files(dl, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'download_stall_timeout', 1)
+    result = dl.download('stub://stall')
+    assert result['status'] == 'error'
+    assert result['timeout'] == 'download'
+    assert os.listdir(tmp_path) == []
+    assert dl.timeouts == {'download': 1}
+
+    dl.download('stub://stall')
+    assert dl.timeouts == {'download': 2}
+
+
+def test_download_without_progress_events_counts_bytes_on_disk(dl, monkeypatch):
+    # Runs for ~4s without a 'downloading' event, well past the extraction deadline
+    monkeypatch.setattr(config, 'extract_timeout', 2)
+    monkeypatch.setattr(config, 'download_stall_timeout', 1)
+    result = dl.download('stub://ffmpeg')
+    assert result['status'] == 'success'
+    assert not dl.timeouts
+
+
+def test_postprocess_timeout_kills_worker_and_removes_files(dl, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'postprocess_timeout', 1)
+    result = dl.download('stub://postprocess')
+    assert result['status'] == 'error'
+    assert result['timeout'] == 'postprocess'
+    assert os.listdir(tmp_path) == []
+    assert dl.timeouts == {'postprocess': 1}
+
+
+def test_second_format_without_hooks_uses_stall_timer(dl, monkeypatch):
+    # Runs ~3s after the first 'finished', well past the postprocess deadline
+    monkeypatch.setattr(config, 'postprocess_timeout', 1)
+    monkeypatch.setattr(config, 'download_stall_timeout', 1)
+    result = dl.download('stub://second-format')
+    assert result['status'] == 'success'
+    assert not dl.timeouts
+
+
+def _running(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason='needs /proc and process groups')
+def test_crashed_worker_leaves_no_children_or_files(dl, tmp_path, monkeypatch):
+    pid_file = tmp_path.parent / f'{tmp_path.name}.child'
+    monkeypatch.setenv('STUB_CHILD_PID_FILE', str(pid_file))
+    result = dl.download('stub://crash')
+    assert result['status'] == 'error'
+    assert '(code 3)' in result['message']
+    assert os.listdir(tmp_path) == []
+
+    pid = int(pid_file.read_text())
+    for _ in range(20):
+        if not _running(pid):
+            break
+        time.sleep(0.1)
+    assert not _running(pid)